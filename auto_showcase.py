@@ -3,6 +3,26 @@ import time
 import sys
 import os
 
+try:
+    from pylsl import resolve_byprop
+    LSL_AVAILABLE = True
+except ImportError:
+    LSL_AVAILABLE = False
+
+STREAM_WAIT_TIMEOUT = 3.0  # Max seconds to wait for the producer's LSL stream
+
+def wait_for_stream(producer_process, timeout=STREAM_WAIT_TIMEOUT):
+    """Block until an EEG stream is visible on LSL, the producer exits, or timeout."""
+    if not LSL_AVAILABLE:
+        time.sleep(2)  # Can't probe without pylsl: fall back to a fixed delay
+        return False
+
+    deadline = time.time() + timeout
+    while time.time() < deadline and producer_process.poll() is None:
+        if resolve_byprop('type', 'EEG', timeout=0.1):
+            return True
+    return False
+
 def run_auto_demo(producer_script, duration_seconds=30, title=""):
     print("\n" + "="*60)
     print(f" 🎬 NEXT SCENE: {title}")
@@ -16,7 +36,7 @@ def run_auto_demo(producer_script, duration_seconds=30, title=""):
     try:
         # Start the LSL Producer
         producer_process = subprocess.Popen([sys.executable, producer_script], cwd=cwd)
-        time.sleep(2) # Give LSL socket time to bind
+        wait_for_stream(producer_process) # Give LSL socket time to bind
         
         # Start Boids Sim
         print(f"🐦 Launching Visualizer... (Running for {duration_seconds} seconds)")
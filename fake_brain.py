@@ -7,10 +7,15 @@ every 10 seconds.
 """
 
 import time
-import math
-import random
+import numpy as np
 from pylsl import StreamInfo, StreamOutlet
 
+try:
+    from pylsl import transp_sync_blocking
+    OUTLET_KWARGS = {"transport_flags": transp_sync_blocking}
+except ImportError:
+    OUTLET_KWARGS = {}  # Older pylsl: no transport_flags, default (copying) transport
+
 # ──────────────────────────────────────────────
 #  CONFIGURATION
 # ──────────────────────────────────────────────
@@ -22,6 +27,7 @@ STREAM_TYPE = 'EEG'
 SOURCE_ID = 'fake_brain_001'
 
 TOGGLE_INTERVAL = 10.0  # Seconds to stay in each state
+CHUNK_SIZE = 64         # Samples per push_chunk (4 pushes per second)
 
 
 def main():
@@ -35,14 +41,22 @@ def main():
         source_id=SOURCE_ID
     )
 
-    # 2. Create Outlet
-    outlet = StreamOutlet(info)
+    # 2. Create Outlet (synchronous transport pushes chunks without copying)
+    outlet = StreamOutlet(info, chunk_size=CHUNK_SIZE, **OUTLET_KWARGS)
     print(f"✅ LSL Outlet created: {STREAM_NAME} ({STREAM_TYPE})", flush=True)
     print(f"   channels={CHANNEL_COUNT}, srate={NOMINAL_SRATE}Hz", flush=True)
     print("   Broadcasting now... Press Ctrl+C to stop.\n", flush=True)
 
+    # Precompute one second of 10Hz alpha (a whole number of cycles, so it
+    # repeats seamlessly), padded by a chunk so any offset slice fits
+    t = np.arange(NOMINAL_SRATE + CHUNK_SIZE) / NOMINAL_SRATE
+    alpha_wave = np.sin(t * 10.0 * 2 * np.pi).astype(np.float32)
+
+    rng = np.random.default_rng()
+    chunk = np.empty((CHUNK_SIZE, CHANNEL_COUNT), dtype=np.float32)
+
     start_time = time.time()
-    last_print_time = 0
+    samples_sent = 0
     
     # State tracking
     is_relaxed = True
@@ -60,27 +74,26 @@ def main():
             state_name = "RELAXED (Alpha waves)" if is_relaxed else "STRESSED (Noise)"
             print(f"[{time.strftime('%H:%M:%S')}] Broadcasting: {state_name}", flush=True)
 
-        # Generate sample based on state
-        sample = []
+        # Generate a whole chunk (samples × channels) in place based on state
+        rng.random(out=chunk, dtype=np.float32)
         if is_relaxed:
             # RELAXED: Smooth sine waves ~10Hz (Alpha) + slight jitter
-            # We use 'now' to drive the sine wave
-            base_val = math.sin(now * 10.0 * 2 * math.pi) 
-            for _ in range(CHANNEL_COUNT):
-                # Add small variation per channel so they aren't identical
-                variation = random.uniform(-0.1, 0.1)
-                sample.append(base_val + variation)
+            # Add small variation per channel so they aren't identical
+            offset = samples_sent % NOMINAL_SRATE
+            chunk *= 0.2
+            chunk += alpha_wave[offset:offset + CHUNK_SIZE, None] - 0.1
         else:
             # STRESSED: High-frequency random noise (Beta/Gamma simulation)
-            for _ in range(CHANNEL_COUNT):
-                sample.append(random.uniform(-2.0, 2.0))
+            chunk *= 4.0
+            chunk -= 2.0
 
-        # Push sample
-        outlet.push_sample(sample)
+        # Push chunk
+        outlet.push_chunk(chunk)
+        samples_sent += CHUNK_SIZE
 
-        # Sleep to maintain sampling rate
-        # 1/256 is approx 0.0039 seconds
-        time.sleep(1.0 / NOMINAL_SRATE)
+        # Sleep until the next chunk is due. Scheduling against the start
+        # time keeps the average rate at 256Hz without accumulating drift.
+        time.sleep(max(0.0, start_time + samples_sent / NOMINAL_SRATE - time.time()))
 
 if __name__ == "__main__":
     try:
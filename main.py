@@ -7,14 +7,13 @@ Integrates LSL (Lab Streaming Layer) for real-time EEG control.
 """
 
 import math
-import random
-import collections
+import functools
+import itertools
 import pygame
-import numpy as np  # For FFT
-from pygame.math import Vector2
+import numpy as np  # For FFT and flocking
 
 # ──────────────────────────────────────────────
-#  LSL IMPORTS
+#  OPTIONAL IMPORTS
 # ──────────────────────────────────────────────
 try:
     from pylsl import StreamInlet, resolve_byprop
@@ -24,6 +23,20 @@ except ImportError as e:
     print(f"⚠️ pylsl import failed: {e}")
     print("⚠️ LSL integration disabled.")
 
+try:
+    from pygame._sdl2.video import Window, Renderer, Texture
+    SDL2_RENDERER_AVAILABLE = True
+except ImportError:
+    SDL2_RENDERER_AVAILABLE = False
+
+try:
+    from numba import njit, prange, cuda
+    NUMBA_AVAILABLE = True
+    CUDA_AVAILABLE = cuda.is_available()
+except ImportError:
+    NUMBA_AVAILABLE = CUDA_AVAILABLE = False
+    print("⚠️ numba not installed. Using the NumPy flocking path.")
+
 
 # ──────────────────────────────────────────────
 #  TUNABLE PARAMETERS — tweak these to taste
@@ -31,6 +44,7 @@ except ImportError as e:
 WIDTH, HEIGHT = 1200, 800          # Window dimensions
 NUM_BOIDS = 50                     # Number of boids in the flock
 PERCEPTION_RADIUS = 50.0           # How far a boid can "see"
+PERCEPTION_RADIUS_SQ = PERCEPTION_RADIUS * PERCEPTION_RADIUS  # Compared against squared distances
 
 # FLOCKING WEIGHTS (Modified by LSL)
 SEPARATION_WEIGHT = 1.5            # Avoid crowding neighbours
@@ -41,9 +55,31 @@ COHESION_WEIGHT = 1.0              # Steer toward centre of mass
 MAX_SPEED = 4.0                    # Maximum velocity magnitude
 MAX_FORCE = 0.1                    # Maximum steering force
 
+# BRAIN-STATE PRESETS: (separation, alignment, cohesion, max speed, max force)
+# DEFAULT is the startup tuning above, kept until (and without) an EEG state.
+# RELAXED groups up, cohesive and calm. STRESSED explodes: extreme repulsion,
+# chaotic headings, repelled from the centre, very fast with strong steering.
+DEFAULT_TUNING = (SEPARATION_WEIGHT, ALIGNMENT_WEIGHT, COHESION_WEIGHT, MAX_SPEED, MAX_FORCE)
+RELAXED_TUNING = (1.0, 1.0, 1.0, 4.0, 0.1)
+STRESSED_TUNING = (10.0, 0.2, -2.0, 10.0, 0.5)
+BRAIN_STATE = "DEFAULT"            # Names the preset in use; picks the compiled kernel
+
+# GPU FLOCKING (needs numba with a CUDA device)
+GPU_MIN_BOIDS = 1000               # Flocks at least this large run on the GPU
+GPU_THREADS_PER_BLOCK = 128        # CUDA block size for the flocking kernel
+
 FPS = 60                           # Target frames per second
+USE_GPU_RENDERER = True            # Draw through pygame._sdl2 when available
+LSL_CHUNK_SAMPLES = 512            # Max EEG samples pulled per pull_chunk call
+LSL_MAX_BUFLEN = 2                 # Seconds of EEG the inlet queues; older samples drop
+FFT_HOP = 32                       # New samples required before re-running the FFT
 BOID_SIZE = 8                      # Triangle size in pixels
-BOID_COLOR = (0, 255, 255)         # Cyan (default: RELAXED)
+SPRITE_ROTATIONS = 64              # Pre-rendered boid headings
+TRAIL_LENGTH = 20                  # Trail points kept per boid
+TRAIL_MIN_FPS = 30                 # Skip trails when the frame rate drops below this
+RELAXED_COLOR = (0, 255, 255)      # Cyan
+STRESSED_COLOR = (255, 0, 0)       # Red
+BOID_COLOR = RELAXED_COLOR         # Current colour (default: RELAXED)
 BG_COLOR = (0, 0, 0)              # Black
 DASHBOARD_FONT = None             # Initialized in main()
 
@@ -51,10 +87,13 @@ DASHBOARD_FONT = None             # Initialized in main()
 # ──────────────────────────────────────────────
 #  DASHBOARD
 # ──────────────────────────────────────────────
-def draw_dashboard(screen, buffer, metrics):
-    """Draws a semi-transparent dashboard with signal and FFT data."""
+def render_dashboard(buffer, metrics):
+    """Draws a semi-transparent dashboard with signal and FFT data.
+
+    Returns the panel surface and its top-left screen position, or None.
+    """
     if not metrics:
-        return
+        return None
 
     # 1. Panel Background
     panel_w, panel_h = 300, 200
@@ -67,12 +106,10 @@ def draw_dashboard(screen, buffer, metrics):
     # Scale raw buffer (-2 to 2 typically) to fit in top 60px
     # Center is at y=30
     if len(buffer) > 1:
-        points = []
-        for i, val in enumerate(buffer):
-            x = (i / 256) * panel_w
-            # Scale factor: 1.0 amplitude -> 20px height
-            y = 30 - (val * 10) 
-            points.append((x, y))
+        x = np.arange(len(buffer)) * (panel_w / 256)
+        # Scale factor: 1.0 amplitude -> 20px height
+        y = 30 - (buffer * 10)
+        points = np.column_stack((x, y)).tolist()
         pygame.draw.lines(s, (255, 255, 255), False, points, 1)
     
     # Label
@@ -106,7 +143,64 @@ def draw_dashboard(screen, buffer, metrics):
     s.blit(state_text, (10, 170))
     s.blit(ratio_text, (160, 170))
 
-    screen.blit(s, (panel_x, panel_y))
+    return s, (panel_x, panel_y)
+
+
+def draw_dashboard(screen, buffer, metrics):
+    """Blit the dashboard panel onto the software screen surface."""
+    panel = render_dashboard(buffer, metrics)
+    if panel:
+        screen.blit(*panel)
+
+
+class RingBuffer:
+    """Fixed-size float32 ring buffer holding the most recent samples.
+
+    Every sample is stored twice, ``size`` apart, so the latest window is
+    always one contiguous slice and ordered() never copies.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.data = np.zeros(2 * size, dtype=np.float32)
+        self.head = 0      # Index of the next write (always < size)
+        self.count = 0     # Number of valid samples
+
+    def __len__(self):
+        return self.count
+
+    def extend(self, values):
+        """Append an array of samples, overwriting the oldest ones."""
+        size = self.size
+        values = values[-size:]
+        end = self.head + len(values)
+        self.data[self.head:end] = values
+        # Mirror the same samples into the other half
+        if end <= size:
+            self.data[self.head + size:end + size] = values
+        else:
+            split = size - self.head
+            self.data[self.head + size:] = values[:split]
+            self.data[:end - size] = values[split:]
+        self.head = end % size
+        self.count = min(self.count + len(values), size)
+
+    def ordered(self):
+        """Return the samples oldest-first as a view, valid until the next extend()."""
+        if self.count < self.size:
+            return self.data[:self.count]
+        return self.data[self.head:self.head + self.size]
+
+
+@functools.lru_cache(maxsize=None)
+def _band_indices(n, rate):
+    """Return the rfft bin indices of the Alpha and Beta bands for ``n`` samples."""
+    freqs = np.fft.rfftfreq(n, 1/rate)
+    # Alpha: 8-12 Hz
+    alpha_idx = np.flatnonzero((freqs >= 8) & (freqs <= 12))
+    # Beta/Noise: 13-30 Hz
+    beta_idx = np.flatnonzero((freqs >= 13) & (freqs <= 30))
+    return alpha_idx, beta_idx
 
 
 def get_brain_state(data_buffer, rate=256):
@@ -117,22 +211,17 @@ def get_brain_state(data_buffer, rate=256):
     if len(data_buffer) < rate:
         return None  # Not enough data yet
 
-    # Convert to numpy array for FFT
-    data = np.array(data_buffer)
+    # Float32 in, complex64 out: no float64 promotion on the FFT path
+    data = np.asarray(data_buffer, dtype=np.float32)
     
-    # Compute FFT
+    # Compute FFT (power = re² + im², no sqrt round-trip through abs)
     fft_vals = np.fft.rfft(data)
-    freqs = np.fft.rfftfreq(len(data), 1/rate)
-    psd = np.abs(fft_vals)**2
+    psd = fft_vals.real**2 + fft_vals.imag**2
 
-    # Extract Band Power
-    # Alpha: 8-12 Hz
-    alpha_mask = (freqs >= 8) & (freqs <= 12)
-    alpha_power = np.sum(psd[alpha_mask])
-
-    # Beta/Noise: 13-30 Hz
-    beta_mask = (freqs >= 13) & (freqs <= 30)
-    beta_power = np.sum(psd[beta_mask])
+    # Extract Band Power (bin indices are cached per buffer length)
+    alpha_idx, beta_idx = _band_indices(len(data), rate)
+    alpha_power = float(psd[alpha_idx].sum())
+    beta_power = float(psd[beta_idx].sum())
 
     # Avoid division by zero
     ratio = 0.0
@@ -152,139 +241,533 @@ def get_brain_state(data_buffer, rate=256):
 
 
 # ──────────────────────────────────────────────
-#  BOID CLASS
+#  FLOCK (Structure-of-Arrays)
 # ──────────────────────────────────────────────
+# The Flock class keeps positions, velocities and accelerations in three
+# (N, 2) float32 arrays, so every rule is evaluated for all boids at once
+# (NumPy broadcasting or a compiled kernel) instead of per boid pair.
 
-class Boid:
-    """A single boid with position, velocity, and acceleration."""
+def _limit(vecs, max_len):
+    """Clamp the length of every vector in ``vecs`` (..., 2) to ``max_len`` (in place)."""
+    # Compare squared lengths; only the vectors over the limit need a sqrt
+    len_sq = np.einsum('...i,...i->...', vecs, vecs)
+    over = len_sq > max_len * max_len
+    if over.any():
+        vecs[over] *= (max_len / np.sqrt(len_sq[over]))[:, None]
+    return vecs
 
-    def __init__(self):
-        self.position = Vector2(random.uniform(0, WIDTH), random.uniform(0, HEIGHT))
-        # Random initial velocity with random direction and speed
-        angle = random.uniform(0, 2 * math.pi)
-        speed = random.uniform(1, MAX_SPEED)
-        self.velocity = Vector2(math.cos(angle) * speed, math.sin(angle) * speed)
-        self.acceleration = Vector2(0, 0)
-        
-        # Trail history (stores tuples of (x, y))
-        self.trail = collections.deque(maxlen=20)
 
-    # ── Flocking rules ────────────────────────
+def _steer_towards(target_vecs, vel):
+    """Return steering forces: desired directions clamped to MAX_FORCE.
 
-    def _steer_towards(self, target_vec):
-        """Return a steering force: desired direction clamped to MAX_FORCE."""
-        if target_vec.length_squared() == 0:
-            return Vector2(0, 0)
-        desired = target_vec.normalize() * MAX_SPEED
-        steer = desired - self.velocity
-        if steer.length() > MAX_FORCE:
-            steer.scale_to_length(MAX_FORCE)
-        return steer
-
-    def separation(self, boids):
-        """Steer to avoid crowding local flockmates."""
-        steer = Vector2(0, 0)
-        total = 0
+    ``target_vecs`` may carry extra leading axes; ``vel`` broadcasts against
+    them. Targets that are the zero vector produce no steering.
+    """
+    norms = np.linalg.norm(target_vecs, axis=-1, keepdims=True)
+    desired = np.divide(target_vecs, norms,
+                        out=np.zeros_like(target_vecs), where=norms > 0) * MAX_SPEED
+    steer = _limit(desired - vel, MAX_FORCE)
+    steer[norms[..., 0] == 0] = 0.0
+    return steer
 
-        for other in boids:
-            diff = self.position - other.position
-            d = diff.length()
-            if other is not self and d < PERCEPTION_RADIUS and d > 0:
-                steer += diff / d          # Away from neighbour, weighted by 1/d
-                total += 1
 
-        if total > 0:
-            steer /= total
-            return self._steer_towards(steer)
-        return steer
+# Uniform grid for neighbour queries. Every cell is at least PERCEPTION_RADIUS
+# wide, so all neighbours of a boid lie in the 3×3 block of cells around it.
+GRID_W = max(1, int(WIDTH // PERCEPTION_RADIUS))
+GRID_H = max(1, int(HEIGHT // PERCEPTION_RADIUS))
+WORLD_SIZE = np.array([WIDTH, HEIGHT], dtype=np.float32)
 
-    def alignment(self, boids):
-        """Steer towards the average heading of local flockmates."""
-        avg_vel = Vector2(0, 0)
-        total = 0
 
-        for other in boids:
-            d = self.position.distance_to(other.position)
-            if other is not self and d < PERCEPTION_RADIUS:
-                avg_vel += other.velocity
-                total += 1
+def _neighbour_cell_table():
+    """Return the ids of the 3×3 cells around every cell (toroidal wrap).
 
-        if total > 0:
-            avg_vel /= total
-            return self._steer_towards(avg_vel)
-        return Vector2(0, 0)
+    Rows are padded with -1 when the grid is too small for nine distinct cells.
+    """
+    table = np.full((GRID_W * GRID_H, 9), -1, dtype=np.intp)
+    for cy in range(GRID_H):
+        for cx in range(GRID_W):
+            cells = sorted({((cy + dy) % GRID_H) * GRID_W + (cx + dx) % GRID_W
+                            for dx, dy in itertools.product((-1, 0, 1), repeat=2)})
+            table[cy * GRID_W + cx, :len(cells)] = cells
+    return table
+
+
+NEIGHBOUR_CELLS = _neighbour_cell_table()
+# Same table as plain Python lists (padding dropped) for the NumPy fallback loop
+NEIGHBOUR_CELL_LISTS = [[c for c in row if c >= 0] for row in NEIGHBOUR_CELLS.tolist()]
 
-    def cohesion(self, boids):
-        """Steer to move toward the average position of local flockmates."""
-        centre = Vector2(0, 0)
-        total = 0
 
-        for other in boids:
-            d = self.position.distance_to(other.position)
-            if other is not self and d < PERCEPTION_RADIUS:
-                centre += other.position
-                total += 1
+def build_grid(pos):
+    """Sort boids by grid cell.
+
+    Returns (cell_of, order, cell_start): boid ``i`` lives in cell
+    ``cell_of[i]`` and the boids of cell ``c`` are
+    ``order[cell_start[c]:cell_start[c + 1]]``.
+    """
+    cx = np.floor(pos[:, 0] * (GRID_W / WIDTH)).astype(np.intp) % GRID_W
+    cy = np.floor(pos[:, 1] * (GRID_H / HEIGHT)).astype(np.intp) % GRID_H
+    cell_of = cy * GRID_W + cx
+
+    order = np.argsort(cell_of, kind="stable")
+    cell_start = np.zeros(GRID_W * GRID_H + 1, dtype=np.intp)
+    np.cumsum(np.bincount(cell_of, minlength=GRID_W * GRID_H), out=cell_start[1:])
+    return cell_of, order, cell_start
+
+
+def wrapped_diff(diff):
+    """Shift offsets (..., 2) in place to their shortest toroidal image."""
+    diff -= np.rint(diff / WORLD_SIZE) * WORLD_SIZE
+    return diff
+
+
+def _neighbour_sums(pos_i, pos_j, rows_j, pr_sq):
+    """Accumulate rule inputs for boids ``pos_i`` over candidates ``pos_j``.
+
+    ``rows_j`` holds each candidate's (vx, vy, 1). Returns the separation
+    and cohesion offset sums, plus the masked sums of those rows — velocity
+    and neighbour count in a single matrix product.
+    """
+    # Pairwise offsets: diff[a, b] points from candidate b to boid a, measured
+    # the short way round the torus so flocks hold together across the seams
+    diff = wrapped_diff(pos_i[:, None, :] - pos_j[None, :, :])
+    d2 = np.einsum('ijk,ijk->ij', diff, diff)
+    # d2 > 0 drops each boid's own pair (and exact overlaps, which would
+    # divide by zero below), so no identity or index check is needed
+    mask = (d2 < pr_sq) & (d2 > 0)
+    weights = mask.astype(np.float32)
+
+    # The square root is only taken for pairs inside the radius
+    inv = np.zeros_like(d2)
+    inv[mask] = 1.0 / np.sqrt(d2[mask])
+
+    # Separation (1/d weights) and cohesion (towards neighbours, i.e. minus
+    # their offsets) contract the same offsets; alignment and counts share
+    # the mask in one product
+    sep, coh = np.einsum('rab,abk->rak', np.stack((inv, -weights)), diff)
+    return sep, coh, weights @ rows_j
+
+
+def _flock_numpy(pos, vel, cell_of, order, cell_start):
+    """NumPy fallback for flock(): one broadcast block per occupied cell."""
+    sep = np.zeros_like(pos)
+    coh = np.zeros_like(pos)
+    sums = np.zeros((len(pos), 3), dtype=np.float32)
+    rows = np.hstack((vel, np.ones((len(pos), 1), dtype=np.float32)))
+
+    # Only compare each cell's boids against the 3×3 cells around it. The
+    # loop runs on plain ints (indexing with NumPy scalars is far slower),
+    # with the globals it reads bound to locals once.
+    starts = cell_start.tolist()
+    neighbour_lists, pr_sq = NEIGHBOUR_CELL_LISTS, PERCEPTION_RADIUS_SQ
+    for c in np.unique(cell_of).tolist():
+        i = order[starts[c]:starts[c + 1]]
+        j = np.concatenate([order[starts[n]:starts[n + 1]] for n in neighbour_lists[c]])
+        sep[i], coh[i], sums[i] = _neighbour_sums(pos[i], pos[j], rows[j], pr_sq)
+
+    ali, counts = sums[:, 0:2], sums[:, 2:3]
+    counts = np.maximum(counts, 1)
+    sep /= counts
+    ali /= counts
+    coh /= counts
+
+    # Steer all three rules in one (3, N, 2) batch, then blend by weight
+    steer = _steer_towards(np.stack((sep, ali, coh)), vel)
+    weights = np.array([SEPARATION_WEIGHT, ALIGNMENT_WEIGHT, COHESION_WEIGHT],
+                       dtype=np.float32)
+    return np.einsum('r,rij->ij', weights, steer)
+
+
+def _steer_scalar(tx, ty, vx, vy, max_speed, max_force):
+    """Scalar _steer_towards(): desired direction clamped to max_force."""
+    t2 = tx * tx + ty * ty
+    if t2 == 0.0:
+        return 0.0, 0.0
+    scale = max_speed / math.sqrt(t2)
+    sx = tx * scale - vx
+    sy = ty * scale - vy
+    s2 = sx * sx + sy * sy
+    if s2 > max_force * max_force:
+        scale = max_force / math.sqrt(s2)
+        sx *= scale
+        sy *= scale
+    return sx, sy
+
+
+def _make_boid_acceleration(steer):
+    """Build the per-boid 3×3 cell scan around a compiled ``steer`` function.
+
+    The same source is compiled for the CPU (njit) and the GPU (CUDA device
+    function), so both backends share one definition of the rules.
+    """
+    def boid_acceleration(i, pos, vel, cell_of, order, cell_start, neighbour_cells,
+                          w_sep, w_ali, w_coh, pr_sq, max_speed, max_force):
+        px, py = pos[i, 0], pos[i, 1]
+        sep_x = sep_y = ali_x = ali_y = coh_x = coh_y = 0.0
+        total = 0
 
+        for k in range(neighbour_cells.shape[1]):
+            c = neighbour_cells[cell_of[i], k]
+            if c < 0:
+                continue
+            for idx in range(cell_start[c], cell_start[c + 1]):
+                j = order[idx]
+                dx = px - pos[j, 0]
+                dy = py - pos[j, 1]
+                # Shortest offset across the toroidal seams
+                if dx > 0.5 * WIDTH:
+                    dx -= WIDTH
+                elif dx < -0.5 * WIDTH:
+                    dx += WIDTH
+                if dy > 0.5 * HEIGHT:
+                    dy -= HEIGHT
+                elif dy < -0.5 * HEIGHT:
+                    dy += HEIGHT
+                d2 = dx * dx + dy * dy
+                # One compare covers range and self (j == i gives d2 == 0)
+                if d2 < pr_sq and d2 > 0.0:
+                    inv = 1.0 / math.sqrt(d2)
+                    sep_x += dx * inv
+                    sep_y += dy * inv
+                    ali_x += vel[j, 0]
+                    ali_y += vel[j, 1]
+                    coh_x -= dx
+                    coh_y -= dy
+                    total += 1
+
+        ax = ay = 0.0
         if total > 0:
-            centre /= total
-            desired = centre - self.position
-            return self._steer_towards(desired)
-        return Vector2(0, 0)
+            vx, vy = vel[i, 0], vel[i, 1]
+            sx, sy = steer(sep_x / total, sep_y / total, vx, vy, max_speed, max_force)
+            ax += sx * w_sep
+            ay += sy * w_sep
+            sx, sy = steer(ali_x / total, ali_y / total, vx, vy, max_speed, max_force)
+            ax += sx * w_ali
+            ay += sy * w_ali
+            sx, sy = steer(coh_x / total, coh_y / total, vx, vy, max_speed, max_force)
+            ax += sx * w_coh
+            ay += sy * w_coh
+        return ax, ay
+
+    return boid_acceleration
+
+
+if NUMBA_AVAILABLE:
+    # boundscheck=False is Numba's default, pinned here because every index
+    # comes from build_grid(), so unchecked indexing is safe
+    _boid_acceleration = njit(fastmath=True, boundscheck=False)(
+        _make_boid_acceleration(njit(fastmath=True, boundscheck=False)(_steer_scalar)))
+
+    def _make_flock_kernel(w_sep, w_ali, w_coh, max_speed, max_force):
+        """Compiled flock() specialised for one brain-state preset.
+
+        The tunables are closed over, so Numba bakes them into the machine
+        code as constants; each state compiles (and disk-caches) its own kernel.
+        """
+        pr_sq = PERCEPTION_RADIUS_SQ
+
+        @njit(parallel=True, fastmath=True, cache=True, boundscheck=False)
+        def kernel(pos, vel, acc, cell_of, order, cell_start, neighbour_cells):
+            # Every boid scans its 3×3 cells in parallel
+            for i in prange(pos.shape[0]):
+                acc[i, 0], acc[i, 1] = _boid_acceleration(
+                    i, pos, vel, cell_of, order, cell_start, neighbour_cells,
+                    w_sep, w_ali, w_coh, pr_sq, max_speed, max_force)
+
+        return kernel
+
+    # One kernel per preset, compiled up front by Flock.compile_kernels()
+    _FLOCK_KERNELS = {
+        "DEFAULT": _make_flock_kernel(*DEFAULT_TUNING),
+        "RELAXED": _make_flock_kernel(*RELAXED_TUNING),
+        "STRESSED": _make_flock_kernel(*STRESSED_TUNING),
+    }
 
-    # ── Lifecycle ─────────────────────────────
 
-    def flock(self, boids):
-        """Compute combined steering from all three rules."""
-        sep = self.separation(boids) * SEPARATION_WEIGHT
-        ali = self.alignment(boids) * ALIGNMENT_WEIGHT
-        coh = self.cohesion(boids) * COHESION_WEIGHT
+if CUDA_AVAILABLE:
+    _boid_acceleration_gpu = cuda.jit(device=True, fastmath=True)(
+        _make_boid_acceleration(cuda.jit(device=True, fastmath=True)(_steer_scalar)))
+
+    @cuda.jit(fastmath=True)
+    def _flock_cuda_kernel(pos, vel, acc, cell_of, order, cell_start, neighbour_cells,
+                           w_sep, w_ali, w_coh, pr_sq, max_speed, max_force):
+        """GPU flock(): one thread per boid, same cell scan as the CPU kernel."""
+        i = cuda.grid(1)
+        if i < pos.shape[0]:
+            ax, ay = _boid_acceleration_gpu(
+                i, pos, vel, cell_of, order, cell_start, neighbour_cells,
+                w_sep, w_ali, w_coh, pr_sq, max_speed, max_force)
+            acc[i, 0] = ax
+            acc[i, 1] = ay
+
+    @functools.lru_cache(maxsize=None)
+    def _device_neighbour_cells():
+        """The constant neighbour-cell table, uploaded to the GPU once."""
+        return cuda.to_device(NEIGHBOUR_CELLS)
+
+    @functools.lru_cache(maxsize=1)
+    def _device_buffers(n):
+        """Device arrays for an ``n``-boid flock, allocated once and reused.
+
+        Returns (pos, vel, acc, cell_of, cell_start, identity), where the
+        identity order is uploaded here and never changes.
+        """
+        return (cuda.device_array((n, 2), dtype=np.float32),
+                cuda.device_array((n, 2), dtype=np.float32),
+                cuda.device_array((n, 2), dtype=np.float32),
+                cuda.device_array(n, dtype=np.intp),
+                cuda.device_array(GRID_W * GRID_H + 1, dtype=np.intp),
+                cuda.to_device(np.arange(n, dtype=np.intp)))
+
+
+def _flock_gpu(pos, vel, acc, cell_of, order, cell_start):
+    """Run the flocking kernel on the GPU and copy the result into ``acc``.
+
+    Boids are uploaded sorted by cell, so each cell's boids sit contiguously
+    in device memory and neighbouring threads, which mostly share a cell,
+    read the same few runs of neighbours instead of scattered rows.
+    """
+    d_pos, d_vel, d_acc, d_cell_of, d_cell_start, d_identity = _device_buffers(len(pos))
+    d_pos.copy_to_device(pos[order])
+    d_vel.copy_to_device(vel[order])
+    d_cell_of.copy_to_device(cell_of[order])
+    d_cell_start.copy_to_device(cell_start)
+
+    blocks = (len(pos) + GPU_THREADS_PER_BLOCK - 1) // GPU_THREADS_PER_BLOCK
+    _flock_cuda_kernel[blocks, GPU_THREADS_PER_BLOCK](
+        d_pos, d_vel, d_acc, d_cell_of, d_identity, d_cell_start,
+        _device_neighbour_cells(),
+        SEPARATION_WEIGHT, ALIGNMENT_WEIGHT, COHESION_WEIGHT,
+        PERCEPTION_RADIUS_SQ, MAX_SPEED, MAX_FORCE)
+    acc[order] = d_acc.copy_to_host()
+
+
+class Trails:
+    """Trail history for the whole flock as one (N, TRAIL_LENGTH, 2) ring.
+
+    Every boid records a point each frame, so all rows share a single head.
+    """
+
+    def __init__(self, n):
+        self.points = np.zeros((n, TRAIL_LENGTH, 2), dtype=np.float32)
+        self.lengths = np.zeros(n, dtype=np.intp)
+        self.head = 0
+
+    def record(self, pos):
+        """Append the current position of every boid."""
+        self.points[:, self.head] = pos
+        self.head = (self.head + 1) % TRAIL_LENGTH
+        np.minimum(self.lengths + 1, TRAIL_LENGTH, out=self.lengths)
 
-        self.acceleration = sep + ali + coh
+    def clear(self, mask):
+        """Forget the trails of the boids selected by ``mask``."""
+        self.lengths[mask] = 0
+
+    def ordered(self):
+        """Return the points oldest-first along axis 1."""
+        return np.roll(self.points, -self.head, axis=1)
+
+
+class Flock:
+    """The flock as (N, 2) float32 position, velocity and acceleration arrays.
+
+    ``pos`` and ``vel`` are the current snapshot; update() writes the next
+    step into ``pos_next``/``vel_next`` and swaps, so the rules only ever
+    read a frame that nothing is writing to.
+    """
+
+    def __init__(self, n, seed=None):
+        rng = np.random.default_rng(seed)
+        self.pos = rng.uniform(0, WORLD_SIZE, size=(n, 2)).astype(np.float32)
+        # Random initial velocity with random direction and speed
+        angle = rng.uniform(0, math.tau, size=n).astype(np.float32)
+        speed = rng.uniform(1, MAX_SPEED, size=(n, 1)).astype(np.float32)
+        self.vel = np.column_stack((np.cos(angle), np.sin(angle)))
+        self.vel *= speed
+        self.acc = np.zeros_like(self.pos)
+        self.pos_next = np.empty_like(self.pos)
+        self.vel_next = np.empty_like(self.vel)
+        self.trails = Trails(n)
+
+    def __len__(self):
+        return len(self.pos)
+
+    # ── Flocking rules ────────────────────────
+
+    def flock(self):
+        """Write combined separation, alignment and cohesion into ``acc``."""
+        pos, vel, acc = self.pos, self.vel, self.acc
+        cell_of, order, cell_start = build_grid(pos)
+        if CUDA_AVAILABLE and len(pos) >= GPU_MIN_BOIDS:
+            _flock_gpu(pos, vel, acc, cell_of, order, cell_start)
+        elif NUMBA_AVAILABLE:
+            # BRAIN_STATE names the preset compiled into the kernel; the other
+            # paths read the tunable globals, which always hold that preset
+            _FLOCK_KERNELS[BRAIN_STATE](pos, vel, acc, cell_of, order, cell_start,
+                                        NEIGHBOUR_CELLS)
+        else:
+            acc[:] = _flock_numpy(pos, vel, cell_of, order, cell_start)
+
+    def compile_kernels(self):
+        """Compile (or load from Numba's cache) every preset's CPU kernel."""
+        if not NUMBA_AVAILABLE or (CUDA_AVAILABLE and len(self) >= GPU_MIN_BOIDS):
+            return
+        cell_of, order, cell_start = build_grid(self.pos)
+        for kernel in _FLOCK_KERNELS.values():
+            kernel(self.pos, self.vel, self.acc, cell_of, order, cell_start, NEIGHBOUR_CELLS)
+        self.acc.fill(0.0)
+
+    # ── Lifecycle ─────────────────────────────
 
     def update(self):
-        """Integrate acceleration → velocity → position, then reset."""
-        # Update trail BEFORE moving (stores previous position)
-        self.trail.append((self.position.x, self.position.y))
-        
-        self.velocity += self.acceleration
-        if self.velocity.length() > MAX_SPEED:
-            self.velocity.scale_to_length(MAX_SPEED)
-        self.position += self.velocity
-        self.acceleration = Vector2(0, 0)
-
-    def edges(self):
-        """Toroidal wrap — boid reappears on the opposite side."""
-        wrapped = False
-        if self.position.x > WIDTH:
-            self.position.x = 0
-            wrapped = True
-        elif self.position.x < 0:
-            self.position.x = WIDTH
-            wrapped = True
-        if self.position.y > HEIGHT:
-            self.position.y = 0
-            wrapped = True
-        elif self.position.y < 0:
-            self.position.y = HEIGHT
-            wrapped = True
-        
-        if wrapped:
-            self.trail.clear()
-
-    def draw(self, screen):
-        """Render the boid as a small triangle pointing in the direction of travel."""
-        # Draw Trail
-        if len(self.trail) > 1:
-            pygame.draw.lines(screen, BOID_COLOR, False, list(self.trail), 1)
-
-        angle = math.atan2(self.velocity.y, self.velocity.x)
-
-        # Triangle vertices: tip in front, two wings behind
-        tip = self.position + Vector2(math.cos(angle), math.sin(angle)) * BOID_SIZE
-        left = self.position + Vector2(math.cos(angle + 2.5), math.sin(angle + 2.5)) * (BOID_SIZE * 0.6)
-        right = self.position + Vector2(math.cos(angle - 2.5), math.sin(angle - 2.5)) * (BOID_SIZE * 0.6)
-
-        pygame.draw.polygon(screen, BOID_COLOR, [tip, left, right])
+        """Integrate acceleration → velocity → position, wrap, then reset."""
+        # Update trails BEFORE moving (stores previous positions)
+        self.trails.record(self.pos)
+
+        np.add(self.vel, self.acc, out=self.vel_next)
+        _limit(self.vel_next, MAX_SPEED)
+        np.add(self.pos, self.vel_next, out=self.pos_next)
+
+        # Toroidal wrap while the new positions are still hot: boids reappear
+        # on the opposite side (keeping their overshoot) with a fresh trail
+        self.trails.clear(((self.pos_next < 0) | (self.pos_next >= WORLD_SIZE)).any(axis=1))
+        np.mod(self.pos_next, WORLD_SIZE, out=self.pos_next)
+
+        self.pos, self.pos_next = self.pos_next, self.pos
+        self.vel, self.vel_next = self.vel_next, self.vel
+        self.acc.fill(0.0)
+
+    def update_flock(self):
+        """Advance the whole flock by one frame."""
+        self.flock()
+        self.update()
+
+
+# Triangle vertices in a boid's own frame (along, across its heading): the
+# tip in front, the wings 2.5 rad either side of it at 0.6× the length
+TRIANGLE_OFFSETS = np.array([
+    [BOID_SIZE, 0.0],
+    [BOID_SIZE * 0.6 * math.cos(2.5), BOID_SIZE * 0.6 * math.sin(2.5)],
+    [BOID_SIZE * 0.6 * math.cos(2.5), -BOID_SIZE * 0.6 * math.sin(2.5)],
+])
+
+
+def boid_triangles(pos, heading):
+    """Return the (N, 3, 2) triangle vertices for unit ``heading``s: tip, left, right."""
+    # Rotating the fixed offsets by the heading needs no trig at all
+    normal = np.column_stack((-heading[:, 1], heading[:, 0]))
+    along, across = TRIANGLE_OFFSETS[None, :, 0:1], TRIANGLE_OFFSETS[None, :, 1:2]
+    return pos[:, None, :] + along * heading[:, None, :] + across * normal[:, None, :]
+
+
+SPRITE_BUCKETS_PER_RADIAN = SPRITE_ROTATIONS / math.tau
+
+
+@functools.lru_cache(maxsize=None)
+def boid_sprites(color):
+    """Pre-render the boid triangle at SPRITE_ROTATIONS evenly spaced headings.
+
+    Cached per colour, so a state flip only rasterises each set once.
+    """
+    half = BOID_SIZE + 1
+    angle = np.linspace(0, math.tau, SPRITE_ROTATIONS, endpoint=False)
+    centre = np.full((SPRITE_ROTATIONS, 2), half, dtype=np.float32)
+    heading = np.column_stack((np.cos(angle), np.sin(angle)))
+
+    sprites = []
+    for triangle in boid_triangles(centre, heading).tolist():
+        surf = pygame.Surface((2 * half, 2 * half), pygame.SRCALPHA)
+        pygame.draw.polygon(surf, color, triangle)
+        sprites.append(surf.convert_alpha())
+    return sprites
+
+
+def draw_boids(screen, flock, draw_trails=True):
+    """Render each boid as a small triangle pointing in the direction of travel."""
+    pos, vel, trails = flock.pos, flock.vel, flock.trails
+    # Draw Trails: one ordered copy of the ring, then a slice per boid
+    if draw_trails:
+        draw_lines, color = pygame.draw.lines, BOID_COLOR  # Bound once for the loop
+        for points, length in zip(trails.ordered().tolist(), trails.lengths.tolist()):
+            if length > 1:
+                draw_lines(screen, color, False, points[-length:], 1)
+
+    # Blit the pre-rendered sprite nearest to each boid's heading
+    sprites = boid_sprites(BOID_COLOR)
+    angle = np.arctan2(vel[:, 1], vel[:, 0])
+    buckets = np.rint(angle * SPRITE_BUCKETS_PER_RADIAN).astype(np.intp) % SPRITE_ROTATIONS
+    topleft = pos - (BOID_SIZE + 1)
+    screen.blits([(sprites[b], p) for b, p in zip(buckets.tolist(), topleft.tolist())],
+                 doreturn=False)
+
+# ──────────────────────────────────────────────
+#  GPU RENDERER (pygame._sdl2)
+# ──────────────────────────────────────────────
+# SDL2's accelerated renderer rotates and composites textures on the GPU,
+# so each boid is a single textured-quad draw instead of a CPU blit.
+
+def create_renderer(title):
+    """Open the window with an SDL2 renderer, or return None to fall back."""
+    if not SDL2_RENDERER_AVAILABLE:
+        return None
+    try:
+        return Renderer(Window(title, size=(WIDTH, HEIGHT)))
+    except pygame.error as e:
+        print(f"⚠️ SDL2 renderer unavailable: {e}. Using software rendering.", flush=True)
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def boid_texture(renderer):
+    """White boid triangle pointing along +x; tinted per frame via ``color``."""
+    half = BOID_SIZE + 1
+    centre = np.full((1, 2), half, dtype=np.float32)
+    triangle = boid_triangles(centre, np.array([[1.0, 0.0]])).tolist()[0]
+    surf = pygame.Surface((2 * half, 2 * half), pygame.SRCALPHA)
+    pygame.draw.polygon(surf, (255, 255, 255), triangle)
+    return Texture.from_surface(renderer, surf)
+
+
+@functools.lru_cache(maxsize=None)
+def trail_layer(renderer):
+    """Window-sized surface and streaming texture the trails are drawn through."""
+    surf = pygame.Surface((WIDTH, HEIGHT))
+    texture = Texture(renderer, (WIDTH, HEIGHT), streaming=True)
+    texture.blend_mode = pygame.BLENDMODE_NONE
+    return surf, texture
+
+
+def draw_boids_gpu(renderer, flock, draw_trails=True):
+    """Renderer version of draw_boids(): trail texture, then one rotated texture per boid."""
+    pos, vel, trails = flock.pos, flock.vel, flock.trails
+    if draw_trails:
+        # One draw.lines per boid, as in draw_boids(), onto a single layer
+        # uploaded once per frame: far cheaper than a call per segment. The
+        # layer is opaque background, so it is copied over the cleared frame
+        # rather than alpha-blended.
+        surf, layer = trail_layer(renderer)
+        surf.fill(BG_COLOR)
+        draw_lines, color = pygame.draw.lines, BOID_COLOR  # Bound once for the loop
+        for points, length in zip(trails.ordered().tolist(), trails.lengths.tolist()):
+            if length > 1:
+                draw_lines(surf, color, False, points[-length:], 1)
+        layer.update(surf)
+        layer.draw()
+
+    texture = boid_texture(renderer)
+    texture.color = BOID_COLOR
+    draw, size = texture.draw, 2 * (BOID_SIZE + 1)  # Bound once for the loop
+    angles = np.degrees(np.arctan2(vel[:, 1], vel[:, 0]))
+    for (x, y), angle in zip((pos - (BOID_SIZE + 1)).tolist(), angles.tolist()):
+        draw(dstrect=(x, y, size, size), angle=angle)
+
+
+def draw_dashboard_gpu(renderer, buffer, metrics):
+    """Upload the dashboard panel as a texture and draw it."""
+    panel = render_dashboard(buffer, metrics)
+    if panel:
+        surf, topleft = panel
+        Texture.from_surface(renderer, surf).draw(dstrect=topleft)
+
 
 # ──────────────────────────────────────────────
 #  MAIN LOOP
@@ -292,12 +775,20 @@ class Boid:
 
 def main():
     global SEPARATION_WEIGHT, ALIGNMENT_WEIGHT, COHESION_WEIGHT
-    global MAX_SPEED, MAX_FORCE, BOID_COLOR
+    global MAX_SPEED, MAX_FORCE, BOID_COLOR, BRAIN_STATE
     global DASHBOARD_FONT
 
     pygame.init()
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("NeuroSwarmBird — Boids Flocking Simulation (LSL Enabled)")
+    caption = "NeuroSwarmBird — Boids Flocking Simulation (LSL Enabled)"
+    renderer = create_renderer(caption) if USE_GPU_RENDERER else None
+    if renderer is None:
+        # SCALED lets SDL present (and upscale) the frame through its own
+        # renderer; DOUBLEBUF asks for a hardware back buffer where available
+        screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.DOUBLEBUF | pygame.SCALED)
+        pygame.display.set_caption(caption)
+        # Build both state atlases now so the first flip never stalls a frame
+        for color in (RELAXED_COLOR, STRESSED_COLOR):
+            boid_sprites(color)
     clock = pygame.time.Clock()
     
     DASHBOARD_FONT = pygame.font.SysFont("monospace", 14)
@@ -309,18 +800,26 @@ def main():
         try:
             streams = resolve_byprop('type', 'EEG', timeout=5)
             if streams:
-                inlet = StreamInlet(streams[0])
+                inlet = StreamInlet(streams[0], max_buflen=LSL_MAX_BUFLEN)
                 print("✅ Connected to LSL stream!", flush=True)
             else:
                 print("⚠️ No EEG stream found. Running in default mode.", flush=True)
         except Exception as e:
             print(f"⚠️ LSL error: {e}. Running in default mode.", flush=True)
 
-    boids = [Boid() for _ in range(NUM_BOIDS)]
+    flock = Flock(NUM_BOIDS)
+    # Compile every preset's kernel now so no state flip stalls the animation
+    flock.compile_kernels()
 
     # ── Signal Smoothing ──
     # Buffer last 1 second of data (~256 samples) for stable averaging
-    signal_buffer = collections.deque(maxlen=256)
+    signal_buffer = RingBuffer(256)
+    samples_since_fft = 0
+
+    # Preallocated destination for pull_chunk (samples × channels, stream dtype)
+    if inlet:
+        chunk_buf = np.empty((LSL_CHUNK_SAMPLES, inlet.channel_count),
+                             dtype=np.dtype(inlet.value_type))
     
     # Default metrics to start (until buffer full)
     current_metrics = {
@@ -341,16 +840,21 @@ def main():
 
         # ── LSL Update ──
         if inlet:
-            # Drain ALL buffered samples this frame
+            # Drain ALL buffered samples this frame, a chunk at a time
             while True:
-                sample, timestamp = inlet.pull_sample(timeout=0.0)
-                if sample is None:
+                _, timestamps = inlet.pull_chunk(timeout=0.0, max_samples=len(chunk_buf),
+                                                 dest_obj=chunk_buf)
+                n = len(timestamps)
+                signal_buffer.extend(chunk_buf[:n, 0])  # Raw channel 0, FFT handles amplitude
+                samples_since_fft += n
+                if n < len(chunk_buf):
                     break
-                signal_buffer.append(sample[0]) # Store raw value, FFT handles amplitude
 
-            # Compute FFT state only when buffer is FULL
-            if len(signal_buffer) == 256:
-                metrics = get_brain_state(signal_buffer)
+            # Compute FFT state only when buffer is FULL and has moved on by at
+            # least FFT_HOP samples — the band ratio changes far slower than 60Hz
+            if len(signal_buffer) == 256 and samples_since_fft >= FFT_HOP:
+                samples_since_fft = 0
+                metrics = get_brain_state(signal_buffer.ordered())
                 
                 if metrics:
                     # Update State if changed
@@ -361,38 +865,37 @@ def main():
 
                 if current_metrics["state"] == "STRESSED":
                     # EXPLODE!
-                    BOID_COLOR = (255, 0, 0)      # Red
-                    SEPARATION_WEIGHT = 10.0      # Extreme repulsion
-                    ALIGNMENT_WEIGHT = 0.2        # Chaos
-                    COHESION_WEIGHT = -2.0         # Repel from center
-                    MAX_SPEED = 10.0              # Very fast
-                    MAX_FORCE = 0.5               # Strong steering
+                    BRAIN_STATE, BOID_COLOR = "STRESSED", STRESSED_COLOR
+                    (SEPARATION_WEIGHT, ALIGNMENT_WEIGHT, COHESION_WEIGHT,
+                     MAX_SPEED, MAX_FORCE) = STRESSED_TUNING
                 else:
                     # Group up
-                    BOID_COLOR = (0, 255, 255)    # Cyan
-                    SEPARATION_WEIGHT = 1.0       # Normal
-                    ALIGNMENT_WEIGHT = 1.0        # Organized
-                    COHESION_WEIGHT = 1.0         # Cohesive
-                    MAX_SPEED = 4.0               # Calm
-                    MAX_FORCE = 0.1               # Gentle steering
+                    BRAIN_STATE, BOID_COLOR = "RELAXED", RELAXED_COLOR
+                    (SEPARATION_WEIGHT, ALIGNMENT_WEIGHT, COHESION_WEIGHT,
+                     MAX_SPEED, MAX_FORCE) = RELAXED_TUNING
 
         # ── Boids Update ──
-        for boid in boids:
-            boid.flock(boids)
-
-        for boid in boids:
-            boid.update()
-            boid.edges()
+        flock.update_flock()
 
         # ── Draw ──
-        screen.fill(BG_COLOR)
-        for boid in boids:
-            boid.draw(screen)
-        
-        # Draw Dashboard Overlay
-        draw_dashboard(screen, signal_buffer, current_metrics)
-
-        pygame.display.flip()
+        # Trails are the first thing to go when the frame rate sags
+        fps = clock.get_fps()
+        draw_trails = fps == 0 or fps >= TRAIL_MIN_FPS
+
+        if renderer:
+            renderer.draw_color = (*BG_COLOR, 255)
+            renderer.clear()
+            draw_boids_gpu(renderer, flock, draw_trails)
+            draw_dashboard_gpu(renderer, signal_buffer.ordered(), current_metrics)
+            renderer.present()
+        else:
+            screen.fill(BG_COLOR)
+            draw_boids(screen, flock, draw_trails)
+
+            # Draw Dashboard Overlay
+            draw_dashboard(screen, signal_buffer.ordered(), current_metrics)
+
+            pygame.display.flip()
         clock.tick(FPS)
 
     pygame.quit()
@@ -8,7 +8,11 @@ Input: EEG_recordings.csv
 Output: LSL Stream "BioSemi" (EEG, 4 channels, 256Hz)
 """
 
+import sys
 import time
+import queue
+import logging
+import logging.handlers
 import pandas as pd
 import numpy as np
 from pylsl import StreamInfo, StreamOutlet
@@ -19,7 +23,22 @@ STREAM_NAME = "BioSemi"
 STREAM_TYPE = "EEG"
 CHANNEL_COUNT = 4
 NOMINAL_SRATE = 256
-SLEEP_INTERVAL = 1.0 / NOMINAL_SRATE  # ~0.0039s
+CHUNK_SIZE = 32  # Samples per push_chunk (8 pushes per second)
+STATUS_INTERVAL = NOMINAL_SRATE * 10  # Samples between status lines (10 seconds)
+
+def start_status_logger():
+    """Return a logger whose lines are formatted and flushed on a background thread."""
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", datefmt="%H:%M:%S"))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+
+    logger = logging.getLogger(STREAM_NAME)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger, listener
 
 def main():
     print(f"🎬 Initializing Playback Brain...")
@@ -27,16 +46,17 @@ def main():
     # 1. Load Data
     try:
         print(f"📂 Loading {CSV_FILE}...")
-        df = pd.read_csv(CSV_FILE)
-        # If timestamps column exists, drop it
-        if 'timestamps' in df.columns:
-            df = df.drop(columns=['timestamps'])
-            
-        # Extract first 4 columns (assuming they are the EEG channels)
-        data = df.iloc[:, :4].values
+        # Pick the first 4 columns after skipping timestamps (assuming they
+        # are the EEG channels) from the header alone
+        header = pd.read_csv(CSV_FILE, nrows=0).columns
+        channel_cols = [col for col in header if col != 'timestamps'][:CHANNEL_COUNT]
+
+        # Parse only those columns, straight to float32 (the LSL stream format)
+        df = pd.read_csv(CSV_FILE, usecols=channel_cols, dtype=np.float32)
+        data = np.ascontiguousarray(df[channel_cols].to_numpy())
         
         # Scale data to match expected range in main.py graph and FFT (-2.0 to 2.0)
-        data = data / 100.0
+        data /= np.float32(100.0)
         
         n_samples = len(data)
         print(f"✅ Loaded {n_samples} samples.")
@@ -55,7 +75,7 @@ def main():
 
     # 2. Setup LSL
     info = StreamInfo(STREAM_NAME, STREAM_TYPE, CHANNEL_COUNT, NOMINAL_SRATE, 'float32', 'playback123')
-    outlet = StreamOutlet(info)
+    outlet = StreamOutlet(info, chunk_size=CHUNK_SIZE)
     
     print(f"✅ LSL Outlet created: {STREAM_NAME} ({STREAM_TYPE})")
     print(f"   channels={CHANNEL_COUNT}, srate={NOMINAL_SRATE}Hz")
@@ -64,33 +84,42 @@ def main():
     # 3. Playback Loop
     row_idx = 0
     start_time = time.time()
+    samples_sent = 0
+    samples_since_log = 0
+    # Status lines go through a queue, so the timed loop never waits on stdout
+    logger, listener = start_status_logger()
     
     try:
         while True:
-            # Get current sample
-            sample = data[row_idx]
+            # Get the next chunk (shorter at the end of the file)
+            chunk = data[row_idx:row_idx + CHUNK_SIZE]
             
             # Push to LSL
-            outlet.push_sample(sample)
+            outlet.push_chunk(chunk)
+            samples_sent += len(chunk)
+            samples_since_log += len(chunk)
             
             # Advance index
-            row_idx += 1
+            row_idx += len(chunk)
             
             # Loop formatting
             if row_idx >= n_samples:
                 row_idx = 0
-                print(f"[{time.strftime('%H:%M:%S')}] 🔄 End of file. Restarting playback...", flush=True)
+                logger.info("🔄 End of file. Restarting playback...")
 
-            # Precise timing: sleep to maintain 256Hz
-            # Note: time.sleep is not perfectly precise, but good enough for simulation
-            time.sleep(SLEEP_INTERVAL)
+            # Sleep until the next chunk is due. Scheduling against the start
+            # time keeps the average rate at 256Hz without accumulating drift.
+            time.sleep(max(0.0, start_time + samples_sent / NOMINAL_SRATE - time.time()))
             
             # Periodic status (every 10 seconds worth of data)
-            if row_idx % (NOMINAL_SRATE * 10) == 0:
-                 print(f"[{time.strftime('%H:%M:%S')}] ▶️  Streaming sample {row_idx}/{n_samples}", flush=True)
+            if samples_since_log >= STATUS_INTERVAL:
+                samples_since_log -= STATUS_INTERVAL
+                logger.info("▶️  Streaming sample %d/%d", row_idx, n_samples)
 
     except KeyboardInterrupt:
         print("\n🛑 Playback stopped by user.")
+    finally:
+        listener.stop()  # Flush any queued status lines
 
 if __name__ == "__main__":
     main()
@@ -8,7 +8,11 @@ Input: EEG_recording.csv (Columns: TP9, AF7, AF8, TP10)
 Output: LSL Stream "Muse" (EEG, 4 channels, 256Hz)
 """
 
+import sys
 import time
+import queue
+import logging
+import logging.handlers
 import pandas as pd
 import numpy as np
 from pylsl import StreamInfo, StreamOutlet
@@ -20,7 +24,22 @@ STREAM_NAME = "Muse"
 STREAM_TYPE = "EEG"
 CHANNEL_COUNT = 4
 NOMINAL_SRATE = 256
-SLEEP_INTERVAL = 1.0 / NOMINAL_SRATE  # ~0.0039s
+CHUNK_SIZE = 32  # Samples per push_chunk (8 pushes per second)
+STATUS_INTERVAL = NOMINAL_SRATE * 10  # Samples between status lines (10 seconds)
+
+def start_status_logger():
+    """Return a logger whose lines are formatted and flushed on a background thread."""
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", datefmt="%H:%M:%S"))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+
+    logger = logging.getLogger(STREAM_NAME)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger, listener
 
 def main():
     print(f"🎬 Initializing PhysioNet Playback...")
@@ -28,7 +47,8 @@ def main():
     # 1. Load Data
     try:
         print(f"📂 Loading {CSV_FILE}...")
-        df = pd.read_csv(CSV_FILE)
+        # Parse only the EEG columns, straight to float32 (the LSL stream format)
+        df = pd.read_csv(CSV_FILE, usecols=lambda col: col in TARGET_COLS, dtype=np.float32)
         
         # Check if target columns exist
         missing_cols = [col for col in TARGET_COLS if col not in df.columns]
@@ -37,15 +57,21 @@ def main():
             return
 
         # Filter columns
-        df = df[TARGET_COLS]
+        data = np.ascontiguousarray(df[TARGET_COLS].to_numpy(np.float32))
         print(f"✅ Selected columns: {TARGET_COLS}")
 
-        # Handle NaNs: Forward fill first, then fill remaining (start) with 0
-        df = df.fillna(method='ffill').fillna(0)
+        # Handle NaNs: Forward fill first, then fill remaining (start) with 0.
+        # Each sample takes the row of the last valid value in its column.
+        nans = np.isnan(data)
+        if nans.any():
+            last_valid = np.where(nans, 0, np.arange(len(data))[:, None])
+            np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+            data = data[last_valid, np.arange(data.shape[1])]
+            np.nan_to_num(data, copy=False, nan=0.0)
         
         # Scale Data: Divide by 100.0 to match Boids simulation range
         # (Muse data is often in uV, e.g., 800.0 -> 8.0)
-        data = df.values / 100.0
+        data *= np.float32(0.01)
         
         n_samples = len(data)
         print(f"✅ Processed {n_samples} samples.")
@@ -64,7 +90,7 @@ def main():
 
     # 2. Setup LSL
     info = StreamInfo(STREAM_NAME, STREAM_TYPE, CHANNEL_COUNT, NOMINAL_SRATE, 'float32', 'muse_playback')
-    outlet = StreamOutlet(info)
+    outlet = StreamOutlet(info, chunk_size=CHUNK_SIZE)
     
     print(f"✅ LSL Outlet created: {STREAM_NAME} ({STREAM_TYPE})")
     print(f"   channels={CHANNEL_COUNT}, srate={NOMINAL_SRATE}Hz")
@@ -72,32 +98,43 @@ def main():
 
     # 3. Playback Loop
     row_idx = 0
+    start_time = time.time()
+    samples_sent = 0
+    samples_since_log = 0
+    # Status lines go through a queue, so the timed loop never waits on stdout
+    logger, listener = start_status_logger()
     
     try:
         while True:
-            # Get current sample
-            sample = data[row_idx]
+            # Get the next chunk (shorter at the end of the file)
+            chunk = data[row_idx:row_idx + CHUNK_SIZE]
             
             # Push to LSL
-            outlet.push_sample(sample)
+            outlet.push_chunk(chunk)
+            samples_sent += len(chunk)
+            samples_since_log += len(chunk)
             
             # Advance index
-            row_idx += 1
+            row_idx += len(chunk)
             
             # Loop formatting
             if row_idx >= n_samples:
                 row_idx = 0
-                print(f"[{time.strftime('%H:%M:%S')}] 🔄 End of file. Restarting playback...", flush=True)
+                logger.info("🔄 End of file. Restarting playback...")
 
-            # Precise timing: sleep to maintain 256Hz
-            time.sleep(SLEEP_INTERVAL)
+            # Sleep until the next chunk is due. Scheduling against the start
+            # time keeps the average rate at 256Hz without accumulating drift.
+            time.sleep(max(0.0, start_time + samples_sent / NOMINAL_SRATE - time.time()))
             
             # Periodic status (every 10 seconds worth of data)
-            if row_idx % (NOMINAL_SRATE * 10) == 0:
-                 print(f"[{time.strftime('%H:%M:%S')}] ▶️  Streaming sample {row_idx}/{n_samples}", flush=True)
+            if samples_since_log >= STATUS_INTERVAL:
+                samples_since_log -= STATUS_INTERVAL
+                logger.info("▶️  Streaming sample %d/%d", row_idx, n_samples)
 
     except KeyboardInterrupt:
         print("\n🛑 Playback stopped by user.")
+    finally:
+        listener.stop()  # Flush any queued status lines
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,9 @@
 import subprocess
-import time
 import sys
 import os
 
+from auto_showcase import wait_for_stream
+
 def run_demo(producer_script):
     """Launches the selected data producer and the main Boids simulation."""
     cwd = os.getcwd()
@@ -14,9 +15,9 @@ def run_demo(producer_script):
         print(f"\n🧠 Launching LSL Producer: {producer_script}...")
         producer_process = subprocess.Popen([sys.executable, producer_script], cwd=cwd)
         
-        # Wait a moment for the LSL stream to initialize and start broadcasting
+        # Wait for the LSL stream to initialize and start broadcasting
         print("⏳ Waiting for stream to initialize...")
-        time.sleep(2)
+        wait_for_stream(producer_process)
         
         # Start the Boids simulation
         print("🐦 Launching NeuroSwarm Simulation (LSL Consumer)...")